@@ -2,6 +2,8 @@
 """
 
 import logging
+from contextlib import contextmanager
+from html import escape
 from threading import Lock
 from cdr import DEFAULT_LOGDIR
 from cdrapi import db
@@ -18,6 +20,9 @@ class Job:
     import lxml.html as HTML
     LOGNAME = "scheduled-job"
     LOGGING_LOCK = Lock()
+    POOL_LOCK = Lock()
+    POOL_SIZE = 4
+    POOL = {}
     LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
     SENDER = "PDQ Operator <NCIPDQoperator@mail.nih.gov>"
     CHARSET = "utf-8"
@@ -33,6 +38,23 @@ class Job:
         "encoding": "unicode",
         "doctype": "<!DOCTYPE html>"
     }
+    TH_STYLES = {
+        "font-family": "Arial",
+        "border": "1px solid #999",
+        "margin": "auto",
+        "padding": "2px",
+    }
+    TH_STYLE = ";".join(f"{k}:{v}" for k, v in TH_STYLES.items())
+    TH_HTML = f'<th style="{escape(TH_STYLE)}">{{}}</th>'
+    TD_STYLES = {
+        "font-family": "Arial",
+        "border": "1px solid #999",
+        "vertical-align": "top",
+        "padding": "2px",
+        "margin": "auto"
+    }
+    TD_STYLE = ";".join(f"{k}:{v}" for k, v in TD_STYLES.items())
+    TD_HTML = f'<td style="{escape(TD_STYLE)}">{{}}</td>'
     SUPPORTED_PARAMETERS = None
 
     def __init__(self, control, name, **opts):
@@ -67,12 +89,81 @@ class Job:
     def run(self):
         raise Exception("derived class must override run() method")
 
+    @classmethod
+    @contextmanager
+    def connection(cls, **opts):
+        """
+        Borrow a database connection from the pool shared by all jobs.
+
+        Jobs which run every few minutes would otherwise pay for a new
+        login to the database server on every run. Idle connections
+        are kept (up to POOL_SIZE for each set of connection options)
+        and checked to make sure they still work before being handed
+        out again. Any uncommitted work is rolled back when the
+        connection comes back to the pool.
+
+        opts       Options passed to `db.connect()` (e.g., `user`).
+        """
+
+        key = tuple(sorted(opts.items()))
+        conn = None
+        with Job.POOL_LOCK:
+            idle = Job.POOL.setdefault(key, [])
+            if idle:
+                conn = idle.pop()
+        if conn is not None:
+            try:
+                conn.cursor().execute("SELECT 1").fetchall()
+            except Exception:
+                conn = None
+        if conn is None:
+            conn = db.connect(**opts)
+        try:
+            yield conn
+        finally:
+            cls.__release(key, conn)
+
+    @classmethod
+    def __release(cls, key, conn):
+        """
+        Put a borrowed connection back in the pool (or close it).
+
+        key        Connection options under which the pool is indexed.
+        conn       Connection handed out by the `connection()` method.
+        """
+
+        try:
+            conn.rollback()
+        except Exception:
+            return
+        with Job.POOL_LOCK:
+            idle = Job.POOL[key]
+            if len(idle) < cls.POOL_SIZE:
+                idle.append(conn)
+                return
+        conn.close()
+
     @staticmethod
-    def get_group_email_addresses(group_name="Developers Notification"):
+    def get_group_email_addresses(group_name="Developers Notification",
+                                  cache=None):
         """
         Replacement for cdr.getEmailList() which does not exclude retired
         accounts.
+
+        group_name Name of the CDR group whose addresses we want.
+        cache      Optional dictionary owned by the caller, in which the
+                   lookups are remembered, so that a job sending several
+                   messages to the same group only goes to the database
+                   once. The caller decides how long it lives (usually
+                   for a single run of the job), so changes to a group's
+                   membership are picked up by the next run.
         """
+
+        if cache is not None:
+            if group_name not in cache:
+                emails = Job.get_group_email_addresses(group_name)
+                cache[group_name] = emails
+            return list(cache[group_name])
         query = db.Query("usr u", "u.email")
         query.join("grp_usr gu", "gu.usr = u.id")
         query.join("grp g", "g.id = gu.grp")
@@ -89,13 +180,10 @@ class Job:
         styles     Optional style tweaks. See merge_styles() method.
         """
 
-        default_styles = {
-            "font-family": "Arial",
-            "border": "1px solid #999",
-            "margin": "auto",
-            "padding": "2px",
-        }
-        style = cls.merge_styles(default_styles, **styles)
+        if styles:
+            style = cls.merge_styles(cls.TH_STYLES, **styles)
+        else:
+            style = cls.TH_STYLE
         return cls.B.TH(label, style=style)
 
     @classmethod
@@ -107,18 +195,28 @@ class Job:
         styles     Optional style tweaks. See merge_styles() method.
         """
 
-        default_styles = {
-            "font-family": "Arial",
-            "border": "1px solid #999",
-            "vertical-align": "top",
-            "padding": "2px",
-            "margin": "auto"
-        }
-        style = cls.merge_styles(default_styles, **styles)
+        if styles:
+            style = cls.merge_styles(cls.TD_STYLES, **styles)
+        else:
+            style = cls.TD_STYLE
         if url:
             return cls.B.TD(cls.B.A(data, href=url), style=style)
         return cls.B.TD(data, style=style)
 
+    @classmethod
+    def td_html(cls, markup):
+        """
+        Helper method to generate the serialized markup for a table cell.
+
+        Used for building large tables, whose rows are assembled as
+        strings and parsed in a single pass (much cheaper than creating
+        each element with the HTML builder).
+
+        markup     Content for the cell, already escaped
+        """
+
+        return cls.TD_HTML.format(markup)
+
     @classmethod
     def serialize(cls, html):
         """
@@ -7,9 +7,13 @@ from cdrapi import db
 from cdrapi.docs import Doc
 from cdrapi.settings import Tier
 from cdrapi.users import Session
+from collections import defaultdict
 from datetime import date, datetime, timedelta
 from functools import cache, cached_property
+from html import escape
 from json import loads
+from lxml import etree
+from pathlib import Path
 from .base_job import Job
 
 import sys
@@ -98,7 +102,6 @@ class Control:
     )
     TSTYLE = "; ".join(TSTYLE)
     TO_STRING_OPTS = {
-        "pretty_print": True,
         "encoding": CHARSET,
         "doctype": "<!DOCTYPE html>"
     }
@@ -153,6 +156,7 @@ class Control:
         self.test = self.mode == "test"
         self.tier = Tier(options.get("tier"))
         self.recip = options.get("recip")
+        self._recips_cache = {}
         timeout = int(options.get("timeout", 300))
         opts = dict(user="CdrGuest", timeout=timeout, tier=self.tier.name)
         self.cursor = db.connect(**opts).cursor()
@@ -211,19 +215,37 @@ class Control:
         self.logger.info(self.sub_title)  ## Testing
 
         self.key = key
-        report = self.create_report()
-        self.logger.debug("report\n%s", report)
-
-        if not self.skip_email:
+        if self.skip_email:
+            self.save_report()
+        else:
+            page = self.create_report()
+            report = self.serialize(page)
+            self.logger.debug("report\n%s", report)
             self.send_report(report)
-
-        self.save_report(report)
+            if self.test:
+                report = self.serialize(page, pretty_print=True)
+            self.save_report(report)
 
 
     def create_report(self):
         """
         Create an HTML document for one of this job's reports.
 
+        Used when the report is to be emailed, in which case we need
+        the entire serialized document in memory anyway.
+
+        Return:
+            tree object for the report's HTML document
+        """
+
+        body = self.B.BODY(*self.report_body())
+        return self.B.HTML(self.html_head(), body)
+
+
+    def report_body(self):
+        """
+        Generate the elements for the body of the report, one at a time.
+
         The reports on summaries are broken down to show lots of
         subsets of the documents in separate tables, so we handle the
         logic here, instantiating as many SummarySet objects as we
@@ -231,18 +253,15 @@ class Control:
         """
 
         style = "font-size: .9em; font-style: italic; font-family: Arial"
-        body = self.B.BODY(
-            self.B.H3(self.title, style="color: navy; font-family: Arial;"),
-            self.B.P("Adjusted date range: %s" % self.sub_title, style=style),
-            self.B.P("Report date: %s" % date.today(), style=style)
-        )
+        yield self.B.H3(self.title, style="color: navy; font-family: Arial;")
+        yield self.B.P("Adjusted date range: %s" % self.sub_title, style=style)
+        yield self.B.P("Report date: %s" % date.today(), style=style)
         for audience in ("Health professionals", "Patients"):
-            body.append(self.summary_table("Summary", True, audience))
-            body.append(self.summary_table("Summary", False, audience))
+            yield self.summary_table("Summary", True, audience)
+            yield self.summary_table("Summary", False, audience)
         if self.key == "english":
-            body.append(self.summary_table("DrugInformationSummary", True))
-            body.append(self.summary_table("DrugInformationSummary", False))
-        return self.serialize(self.B.HTML(self.html_head(), body))
+            yield self.summary_table("DrugInformationSummary", True)
+            yield self.summary_table("DrugInformationSummary", False)
 
 
     def summary_table(self, doc_type, new, audience=None):
@@ -268,21 +287,42 @@ class Control:
         return SummarySet(self, **args).table()
 
 
-    def save_report(self, report):
+    def save_report(self, report=None):
         """
         Write the generated report to the cdr/reports directory.
 
-        report    Serialized HTML document for the report.
+        report    Serialized HTML document for the report. If None
+                  (because the report isn't being emailed), the
+                  document is streamed to disk one table at a time,
+                  so that the full serialized report is never held
+                  in memory.
         """
 
         stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
         test = ".test" if self.test else ""
         name = f"gd-{self.key}-{stamp}{test}.html"
         path = f"{BASEDIR}/reports/{name}"
-        with open(path, "wb") as fp:
-            fp.write(report)
+        if report is None:
+            self.stream_report(path)
+        else:
+            Path(path).write_bytes(report)
         self.logger.info("created %s", path)
 
+    def stream_report(self, path):
+        """
+        Serialize the report incrementally, writing directly to disk.
+
+        path      Location of the file to be written.
+        """
+
+        with etree.htmlfile(path, encoding=self.CHARSET) as xf:
+            xf.write_doctype(self.TO_STRING_OPTS["doctype"])
+            with xf.element("html"):
+                xf.write(self.html_head(), pretty_print=True)
+                with xf.element("body"):
+                    for element in self.report_body():
+                        xf.write(element, pretty_print=True)
+
     def html_head(self):
         "Common code to create the top part of the generated report."
         return self.B.HEAD(
@@ -307,7 +347,8 @@ class Control:
                     "spanish": "GovDelivery ES Docs Notification",
                     "english": "GovDelivery EN Docs Notification",
                 }.get(self.key)
-                recips = Job.get_group_email_addresses(group)
+            cache = self._recips_cache
+            recips = Job.get_group_email_addresses(group, cache)
         if recips:
             subject = f"[{self.tier.name}] {self.title}"
             opts = dict(subject=subject, body=report, subtype="html")
@@ -318,6 +359,61 @@ class Control:
         else:
             self.logger.error("no email recipients for %s", group)
 
+    @cached_property
+    def summary_dimension(self):
+        """
+        Name of the temporary table of summaries for this run's reports.
+
+        All of the slices of all of the reports in this run look at the
+        same universe of active, published summaries, so we do the joins
+        needed for the title, URL, audience, language, and dates once,
+        limited to documents which were published or modified in the
+        date range, and the per-slice queries filter this table. The
+        table is loaded the first time the property is used.
+        """
+
+        # The table has to be created outside the parameterized
+        # statement, which the driver runs in its own scope. A table
+        # left behind on the connection by a failed run is dropped first.
+        start = datetime.now()
+        self.cursor.execute(SummarySet.DROP_DIMENSION_TABLE)
+        self.cursor.execute(SummarySet.DIMENSION_TABLE)
+        parms = [self.start, self.end] * 4
+        self.cursor.execute(SummarySet.DIMENSION, parms)
+        args = self.cursor.rowcount, datetime.now() - start
+        self.logger.debug("summary_dimension: %d rows in %s", *args)
+        return "#summary_dim"
+
+    @cached_property
+    def summary_slices(self):
+        """
+        Rows for every slice of this run's reports, in one round trip.
+
+        Each row from the summary dimension table is tagged in the SQL
+        with flags showing whether the document was first published
+        and/or modified in the report's date range, and is dropped into
+        the bucket for each slice it belongs to.
+
+        Return:
+            dictionary of sequences of (doc_id, title, url, fragment)
+            tuples, ordered by title and indexed by (doc_type, new,
+            audience, language)
+        """
+
+        start = datetime.now()
+        slices = defaultdict(list)
+        sql = SummarySet.SLICES.format(self.summary_dimension)
+        parms = [self.start, self.end] * 2
+        for row in self.cursor.execute(sql, parms).fetchall():
+            summary = row.doc_id, row.title, row.url, row.fragment
+            for new, in_range in ((True, row.new), (False, row.revised)):
+                if in_range:
+                    key = row.doc_type, new, row.audience, row.language
+                    slices[key].append(summary)
+        args = len(slices), datetime.now() - start
+        self.logger.debug("summary_slices: %d slices in %s", *args)
+        return slices
+
     @cached_property
     def session(self):
         """Guest session for fetching documents."""
@@ -332,13 +428,10 @@ class Control:
         styles     Optional style tweaks. See merge_styles() method.
         """
 
-        default_styles = {
-            "font-family": "Arial",
-            "border": "1px solid #999",
-            "margin": "auto",
-            "padding": "2px",
-        }
-        style = cls.merge_styles(default_styles, **styles)
+        if styles:
+            style = cls.merge_styles(Job.TH_STYLES, **styles)
+        else:
+            style = Job.TH_STYLE
         return cls.B.TH(label, style=style)
 
     @classmethod
@@ -350,20 +443,27 @@ class Control:
         styles     Optional style tweaks. See merge_styles() method.
         """
 
-        default_styles = {
-            "font-family": "Arial",
-            "border": "1px solid #999",
-            "vertical-align": "top",
-            "padding": "2px",
-            "margin": "auto"
-        }
-        style = cls.merge_styles(default_styles, **styles)
+        if styles:
+            style = cls.merge_styles(Job.TD_STYLES, **styles)
+        else:
+            style = Job.TD_STYLE
         if url:
             return cls.B.TD(cls.B.A(data, href=url), style=style)
         elif isinstance(data, (list, tuple)):
             return cls.B.TD(*data, style=style)
         return cls.B.TD(data, style=style)
 
+    @staticmethod
+    def link_html(text, url):
+        """
+        Helper method to generate the serialized markup for a link.
+
+        text       Display string for the link (not yet escaped)
+        url        Target for the link (not yet escaped)
+        """
+
+        return f'<a href="{escape(url)}">{escape(text)}</a>'
+
     @classmethod
     def li(cls, text, url=None):
         """
@@ -380,14 +480,29 @@ class Control:
         return cls.B.LI(text, style="font-family: Arial")
 
     @classmethod
-    def serialize(cls, html):
+    def serialize(cls, html, **opts):
         """
         Create a properly encoded string for the report.
 
+        The report is serialized without pretty-printing by default,
+        as the email recipients have no need for the extra whitespace.
+
         html       Tree object created using lxml HTML builder.
+        opts       Optional overrides of the serialization options
+                   (e.g., pretty_print=True for a saved test report).
+        """
+
+        return cls.HTML.tostring(html, **dict(cls.TO_STRING_OPTS, **opts))
+
+    @classmethod
+    def serialize_fragment(cls, element):
+        """
+        Create the markup for a piece of the report as a string.
+
+        element    Object created using lxml HTML builder.
         """
 
-        return cls.HTML.tostring(html, **cls.TO_STRING_OPTS)
+        return cls.HTML.tostring(element, encoding="unicode")
 
     @staticmethod
     def merge_styles(defaults, **styles):
@@ -431,7 +546,7 @@ class Control:
             query = db.Query("pub_proc", "top 1 MAX(id), started")
             query.where("status = 'Success'")
             query.where("pub_subset = 'Export'")
-            query.where(f"id < {job_id}")
+            query.where(query.Condition("id", job_id, "<"))
             query.group("started").order("started DESC")
 
             row = query.execute(self.cursor).fetchone()
@@ -504,22 +619,42 @@ class Summary:
 
         if self.summary_set.doc_type != "Summary":
             return ""
+        sql = self.board_sql(self.summary_set.language == "English")
+        rows = self.control.cursor.execute(sql, self.cdr_id).fetchall()
+        if not rows:
+            return ""
+        board = rows[0].value.replace("PDQ", "").replace("Editorial Board", "")
+        return board.strip()
+
+    @staticmethod
+    @cache
+    def board_sql(english):
+        """
+        Assemble the SQL for finding a summary's board.
+
+        Everything but the summary's ID is fixed for a given language,
+        so the SQL is built once per process for each case, and the
+        ID is bound as a parameter.
+
+        english     True if the summary is in English; a Spanish summary's
+                    board is found through the English original
+
+        Return:
+            SQL string with a placeholder for the summary's CDR ID
+        """
+
         query = db.Query("query_term n", "n.value")
         query.join("query_term b", "b.int_val = n.doc_id")
-        query.where(f"b.path = '{self.BOARD}'")
-        query.where(f"n.path = '{self.ORG_NAME}'")
+        query.where(f"b.path = '{Summary.BOARD}'")
+        query.where(f"n.path = '{Summary.ORG_NAME}'")
         query.where("n.value LIKE 'PDQ%Editorial Board'")
-        if self.summary_set.language == "English":
-            query.where(query.Condition("b.doc_id", self.cdr_id))
+        if english:
+            query.where("b.doc_id = ?")
         else:
             query.join("query_term t", "t.int_val = b.doc_id")
             query.where("t.path = '/Summary/TranslationOf/@cdr:ref'")
-            query.where(query.Condition("t.doc_id", self.cdr_id))
-        rows = query.execute(self.control.cursor).fetchall()
-        if not rows:
-            return ""
-        board = rows[0].value.replace("PDQ", "").replace("Editorial Board", "")
-        return board.strip()
+            query.where("t.doc_id = ?")
+        return str(query)
 
     @cached_property
     def change_blocks(self):
@@ -610,26 +745,26 @@ class Summary:
         return self.board, self.title.lower()
 
     @cached_property
-    def tr(self):
+    def row(self):
         """
-        Create the object for the row displaying this document's information
+        Serialized markup for the row displaying this document's information
         in a table.
-
-        summary_set   Provides additional information about the document.
         """
 
-        frag_url = None
-        changed_hp = False
-        columns = [Control.td(str(self.cdr_id), self.url)]
+        td = Job.td_html
+        cells = [td(Control.link_html(str(self.cdr_id), self.url))]
         if self.summary_set.audience == "Health professionals":
             frag_url = f"{self.url}#{self.fragment}"
-            columns.append(Control.td(self.title, frag_url))
-            columns.append(Control.td(self.board))
+            cells.append(td(Control.link_html(self.title, frag_url)))
+            cells.append(td(escape(self.board)))
             if not self.summary_set.new:
-                columns.append(Control.td(self.changes or ""))
+                changes = []
+                for change in self.changes:
+                    changes.append(Control.serialize_fragment(change))
+                cells.append(td("".join(changes)))
         else:
-            columns.append(Control.td(self.title))
-        return Control.B.TR(*columns)
+            cells.append(td(escape(self.title)))
+        return f"<tr>{''.join(cells)}</tr>"
 
 
 class SummarySet:
@@ -646,9 +781,93 @@ class SummarySet:
                   Summaries).
     audience      "Health professionals" or "Patients" (not used for
                   Drug Information Summaries).
-    caption       String used to identify which results set this is.
+    caption       String used to identify which results set this is
+                  (assembled when the table is built).
     """
 
+    SUMMARY_PATH = "/Summary/SummaryTitle"
+    SUMMARY_URL = "/Summary/SummaryMetaData/SummaryURL/@cdr:xref"
+    AUDIENCE_PATH = "/Summary/SummaryMetaData/SummaryAudience"
+    LANGUAGE_PATH = "/Summary/SummaryMetaData/SummaryLanguage"
+    SECTION_TYPE_PATH = "/Summary/SummarySection/SectMetaData/SectionType"
+    SECTION_ID_PATH = "/Summary/SummarySection/@cdr:id"
+    DIS_PATH = "/DrugInformationSummary/Title"
+    DIS_URL = "/DrugInformationSummary/DrugInfoMetaData/URL/@cdr:xref"
+    DROP_DIMENSION_TABLE = """\
+IF OBJECT_ID('tempdb..#summary_dim') IS NOT NULL DROP TABLE #summary_dim"""
+    DIMENSION_TABLE = """\
+CREATE TABLE #summary_dim (
+         doc_id INTEGER NOT NULL,
+       doc_type VARCHAR(32) NOT NULL,
+          title NVARCHAR(800) NOT NULL,
+            url NVARCHAR(800) NOT NULL,
+       audience NVARCHAR(800) NULL,
+       language NVARCHAR(800) NULL,
+      first_pub DATETIME NULL,
+  last_modified NVARCHAR(800) NULL,
+       fragment NVARCHAR(800) NULL
+)"""
+    DIMENSION = f"""\
+INSERT INTO #summary_dim
+    SELECT d.id, 'Summary', t.value, u.value, a.value, l.value,
+           d.first_pub, m.value, f.value
+      FROM document d
+      JOIN query_term_pub t
+        ON t.doc_id = d.id
+       AND t.path = '{SUMMARY_PATH}'
+      JOIN query_term_pub u
+        ON u.doc_id = d.id
+       AND u.path = '{SUMMARY_URL}'
+LEFT OUTER JOIN query_term_pub a
+        ON a.doc_id = d.id
+       AND a.path = '{AUDIENCE_PATH}'
+LEFT OUTER JOIN query_term_pub l
+        ON l.doc_id = d.id
+       AND l.path = '{LANGUAGE_PATH}'
+LEFT OUTER JOIN query_term_pub m
+        ON m.doc_id = d.id
+       AND m.path = '/Summary/DateLastModified'
+LEFT OUTER JOIN query_term_pub s
+        ON s.doc_id = d.id
+       AND s.path = '{SECTION_TYPE_PATH}'
+       AND s.value = 'Changes to summary'
+LEFT OUTER JOIN query_term_pub f
+        ON f.doc_id = d.id
+       AND LEFT(f.node_loc, 4) = LEFT(s.node_loc, 4)
+       AND f.path = '{SECTION_ID_PATH}'
+     WHERE d.active_status = 'A'
+       AND EXISTS (SELECT 1 FROM pub_proc_cg c WHERE c.id = d.id)
+       AND (ISNULL(d.first_pub, 0) > ? AND ISNULL(d.first_pub, 0) <= ?
+         OR ISNULL(m.value, 0) > ? AND ISNULL(m.value, 0) <= ?)
+ UNION ALL
+    SELECT d.id, 'DrugInformationSummary', t.value, u.value, NULL, NULL,
+           d.first_pub, m.value, NULL
+      FROM document d
+      JOIN query_term_pub t
+        ON t.doc_id = d.id
+       AND t.path = '{DIS_PATH}'
+      JOIN query_term_pub u
+        ON u.doc_id = d.id
+       AND u.path = '{DIS_URL}'
+LEFT OUTER JOIN query_term_pub m
+        ON m.doc_id = d.id
+       AND m.path = '/DrugInformationSummary/DateLastModified'
+     WHERE d.active_status = 'A'
+       AND EXISTS (SELECT 1 FROM pub_proc_cg c WHERE c.id = d.id)
+       AND (ISNULL(d.first_pub, 0) > ? AND ISNULL(d.first_pub, 0) <= ?
+         OR ISNULL(m.value, 0) > ? AND ISNULL(m.value, 0) <= ?)"""
+    SLICES = """\
+SELECT DISTINCT doc_type, audience, language,
+                CASE WHEN ISNULL(first_pub, 0) > ?
+                      AND ISNULL(first_pub, 0) <= ?
+                     THEN 1 ELSE 0 END AS new,
+                CASE WHEN ISNULL(last_modified, 0) > ?
+                      AND ISNULL(last_modified, 0) <= ?
+                     THEN 1 ELSE 0 END AS revised,
+                doc_id, title, url, fragment
+           FROM {}
+       ORDER BY title"""
+
     def __init__(self, control, **kwargs):
         "Extract the options used to construct this results set."
         self.control = control
@@ -657,10 +876,17 @@ class SummarySet:
         self.language = kwargs.get("language")
         self.audience = kwargs.get("audience")
         self.summaries = self.get_summaries(control)
-        self.caption = self.make_caption()
+        self.caption = None
+
+    def make_caption(self, count):
+        """
+        Assemble the string used to identify the results set.
+
+        count      Number of revised HP summaries with more than
+                   editorial changes (tallied while the table rows
+                   are built; not used for other sets).
+        """
 
-    def make_caption(self):
-        "Assemble the string used to identify the results set."
         caption = self.new and "New " or "Revised "
         if self.doc_type == "Summary":
             if self.audience == "Patients":
@@ -670,10 +896,6 @@ class SummarySet:
                 if self.new:
                     caption += f" ({len(self.summaries)})"
                 else:
-                    count = 0
-                    for summary in self.summaries:
-                        if not summary.editorial_changes:
-                            count += 1
                     caption += f" ({count}, excluding editorial changes)"
         else:
             caption += "Drug Information Summaries"
@@ -693,90 +915,22 @@ class SummarySet:
             args = is_new, self.doc_type, self.audience
             self.control.logger.debug(f"%s%s - %s", *args)
 
-        # Set paths here so we can avoid super-long code lines.
-        l_path = "/Summary/SummaryMetaData/SummaryLanguage"
-        a_path = "/Summary/SummaryMetaData/SummaryAudience"
-        s_path = "/Summary/SummarySection/SectMetaData/SectionType"
-        f_path = "/Summary/SummarySection/@cdr:id"
-        if self.doc_type == "Summary":
-            t_path = "/Summary/SummaryTitle"
-            u_path = "/Summary/SummaryMetaData/SummaryURL/@cdr:xref"
-        else:
-            t_path = "/DrugInformationSummary/Title"
-            u_path = "/DrugInformationSummary/DrugInfoMetaData/URL/@cdr:xref"
-
-        # For summaries we need a fourth column for fragment links.
-        f_col = self.doc_type == "Summary" and "f.value" or "NULL as dummy"
-        columns = ["d.id", "t.value", "u.value", f_col]
-
-        # Create a new query against the document table.
-        query = db.Query("document d", *columns).order("t.value").unique()
-
-        # Make sure the document is active and currently published.
-        query.where("d.active_status = 'A'")
-        query.join("pub_proc_cg c", "c.id = d.id")
-
-        # Add a join to get the document's title.
-        query.join("query_term_pub t", "t.doc_id = d.id")
-        query.where(query.Condition("t.path", t_path))
-
-        # Another join to get the URL for linking to the doc on cancer.gov.
-        query.join("query_term_pub u", "u.doc_id = d.id")
-        query.where(query.Condition("u.path", u_path))
-
-        # Test to see if the creation or modification of the doc is in range.
-        if not self.new:
-            query.outer("query_term_pub m", "m.doc_id = d.id",
-                        "m.path = '/%s/DateLastModified'" % self.doc_type)
-        date_val = "ISNULL(%s, 0)" % (self.new and "d.first_pub" or "m.value")
-        query.where(query.Condition(date_val, control.start, ">"))
-        query.where(query.Condition(date_val, control.end, "<="))
-
-        # For summaries we do each audience separately.
-        if self.audience:
-            query.join("query_term_pub a", "a.doc_id = d.id")
-            query.where(query.Condition("a.path", a_path))
-            query.where(query.Condition("a.value", self.audience))
-
-        # Each report is language-specific for Summary documents.
-        if self.language:
-            query.join("query_term_pub l", "l.doc_id = d.id")
-            query.where(query.Condition("l.path", l_path))
-            query.where(query.Condition("l.value", self.language))
-
-        # For HP Summary documents we need a fragment link to the changes.
-        if self.doc_type == "Summary":
-            query.outer("query_term_pub s", "s.doc_id = d.id",
-                        "s.path = '%s'" % s_path,
-                        "s.value = 'Changes to summary'")
-            query.outer("query_term_pub f", "f.doc_id = d.id",
-                        "LEFT(f.node_loc, 4) = LEFT(s.node_loc, 4)",
-                        "f.path = '%s'" % f_path)
-
-        # If we're debugging log the query string.
-        control.logger.debug(query)
-
-        # Fetch the documents and pack up a sequence of Summary objects.
-        start = datetime.now()
-        rows = query.execute(control.cursor).fetchall()
-        args = len(rows), datetime.now() - start
-        control.logger.debug("get_summaries(): %d rows in %s", *args)
-
-        summaries = []
+        # All of the slices are fetched together (see Control), so all
+        # we do here is pick up the rows for this one.
+        key = self.doc_type, self.new, self.audience, self.language
+        rows = control.summary_slices.get(key, [])
+        control.logger.debug("get_summaries(): %d rows", len(rows))
         control.logger.debug(rows)
 
+        # Pack up a sequence of Summary objects.
+        summaries = []
         for row in rows:
-            id = row[0]
             # Check if latest pub version of summary was created after
             # the last publishing job started
-            if self.late_pubversion(control, id):
-                if self.is_published(control, id):
-                    summaries.append(row)
-                continue
-            summaries.append(row)
-
-        if summaries:
-            return [Summary(self, *row) for row in summaries]
+            if self.late_pubversion(control, row[0]):
+                if not self.is_published(control, row[0]):
+                    continue
+            summaries.append(Summary(self, *row))
         return summaries
 
 
@@ -802,7 +956,7 @@ class SummarySet:
         # publishing job started?
         subq = db.Query("pub_proc_doc pd", "max(doc_version)")
         subq.join("pub_proc pp", "pp.id = pd.pub_proc")
-        subq.where(f"doc_id = {doc_id}")
+        subq.where(subq.Condition("doc_id", doc_id))
         subq.where("o.id = pd.doc_id")
         subq.where("failure IS NULL")
         subq.where("pub_subset like 'Push%Export'")
@@ -842,7 +996,7 @@ class SummarySet:
         # Retrieve the version number and creation date for that version
         subq = db.Query("pub_proc_doc pd", "max(doc_version)")
         subq.join("pub_proc pp", "pp.id = pd.pub_proc")
-        subq.where(f"doc_id = {doc_id}")
+        subq.where(subq.Condition("doc_id", doc_id))
         subq.where("o.id = pd.doc_id")
         subq.where("failure IS NULL")
         subq.where("pub_subset like 'Push%Export'")
@@ -872,14 +1026,20 @@ class SummarySet:
 
 
     def table(self):
-        "Show a single summary results set for the report."
+        """
+        Show a single summary results set for the report.
+
+        The count of substantive revisions needed for the caption is
+        collected in the same pass which builds the table's rows.
+        """
+
         style = "font-weight: bold; font-size: 1.2em; font-family: Arial"
         style += "; text-align: left;"
-        table = Control.B.TABLE(
-            Control.B.CAPTION(self.caption, style=style),
-            style=Control.TSTYLE,
-        )
+        caption = Control.B.CAPTION(style=style)
+        table = Control.B.TABLE(caption, style=Control.TSTYLE)
+        count = 0
         if self.summaries:
+            tally = self.audience == "Health professionals" and not self.new
             summaries = self.summaries
             headers = [Control.th("CDR ID"), Control.th("Title")]
             if self.audience == "Health professionals":
@@ -889,11 +1049,19 @@ class SummarySet:
                     headers.append(Control.th("Section(s)"))
             headers = Control.B.TR(*headers)
             table.append(headers)
+            rows = []
             for summary in summaries:
-                self.control.logger.debug(str(summary))
-                table.append(summary.tr)
+                self.control.logger.debug("%s", summary)
+
+                # Do this first: building the row can prune the changes.
+                if tally and not summary.editorial_changes:
+                    count += 1
+                rows.append(summary.row)
+            rows = f"<table>{''.join(rows)}</table>"
+            table.extend(Control.HTML.fragment_fromstring(rows))
         else:
             table.append(Control.B.TR(Control.td("None")))
+        self.caption = caption.text = self.make_caption(count)
         return table
 
 
@@ -4,16 +4,25 @@ Report on which data partners fetched PDQ data.
 
 # Standard library modules
 import argparse
+from collections import defaultdict
 import datetime
 import gzip
+import io
 import os
 import re
+import subprocess
+from sys import intern
 
 # Third-party modules
 from dateutil.relativedelta import relativedelta
 from lxml import etree
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 import requests
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
 
 # Project modules
 import cdr
@@ -44,7 +53,14 @@ class Report(Job):
     WIDTHS = 15, 50, 40, 10, 10, 10
     LABELS = "Login", "Partner", "Path", "Session", "Date", "Time"
     NON_PARTNERS = cdr.getControlValue("PDQ", "non-partners", "")
-    NON_PARTNERS = set(NON_PARTNERS.split(","))
+    NON_PARTNERS = frozenset(
+        name.strip() for name in NON_PARTNERS.split(",") if name.strip()
+    )
+    RECORD_RE = re.compile(
+        rb'sshd\[(\d+)\]: (?:open "(?:/pdq/full/)?([^"\n]*)"'
+        rb"|session opened for local user (\S+))"
+    )
+    CHUNK_SIZE = 1 << 20
     SUPPORTED_PARAMETERS = {"month", "noemail", "recips", "resend"}
 
     def run(self):
@@ -84,10 +100,24 @@ class Report(Job):
             self._noemail = True if self.opts.get("noemail") else False
         return self._noemail
 
+    @property
+    def org_names(self):
+        """Partner organization names indexed by sftp login ID."""
+
+        if not hasattr(self, "_org_names"):
+            orgs = self.orgs
+            names = {uid: orgs[uid].name or "" for uid in orgs if uid}
+            self._org_names = names
+        return self._org_names
+
     @property
     def orgs(self):
         """
         Fetch the information about the organizations with which we partner.
+
+        The response is parsed as it streams in, and each org_id element
+        is discarded as soon as we've pulled its values out, so we don't
+        hang on to the whole document for the rest of the run.
         """
 
         if hasattr(self, "_orgs"):
@@ -102,12 +132,16 @@ class Report(Job):
                 self.status = cdr.get_text(node.find("org_status"))
                 self.uid = cdr.get_text(node.find("ftp_userid"))
                 self.terminated = cdr.get_text(node.find("terminated"))
-        root = etree.fromstring(requests.get(url).content)
+        response = requests.get(url, stream=True)
+        response.raw.decode_content = True
         self._orgs = {}
-        for node in root.findall("org_id"):
+        for _, node in etree.iterparse(response.raw, tag="org_id"):
             org = Org(node)
             if org.uid is not None:
                 self._orgs[org.uid] = org
+            node.clear()
+            while node.getprevious() is not None:
+                del node.getparent()[0]
         return self._orgs
 
     @property
@@ -141,76 +175,71 @@ class Report(Job):
         report. We're interested in two types of lines (records):
         session opening lines, from which we build our dictionary
         of login IDs mapped by session IDs; and file opening lines,
-        from which we parse our request objects. We skip over requests
+        from which we parse our requests. We skip over requests
         made using login accounts which are known not to represent
         PDQ data partners (CBIIT accounts, developer accounts, testing
         accounts, etc.).
 
+        The requests are returned as a single list, ordered by login
+        ID and then by the order in which they appear in the log, so
+        that the report can write them out in one pass.
+
+        Each request is a tuple of the values for the report's columns:
+        login ID, partner name, path, session ID, date, and time. The
+        second field of the log record holds the digit(s) for the date
+        the request was received. In order to ensure that the value has
+        a uniform width (for possible sorting purposes), we stick a zero
+        in front of the value and use the last two characters.
+
         The session IDs appear in fields which look like this example:
 
             sshd[9223]:
 
-        ... which is why we use the expression [5:-2] to extract them.
+        ... and are picked up, along with the login ID or the path of
+        the file opened (less its leading /pdq/full/), by the RECORD_RE
+        pattern. The records() method runs that pattern over large
+        blocks of the log, so the lines we don't care about (most of
+        the log) are skipped by the regular expression engine without
+        ever coming back to this loop, and without being decoded. For
+        the lines we keep we only decode the pieces we need.
+        The logins, paths, and dates repeat over and over in a month's
+        requests, so we intern them to keep one copy of each string.
         """
 
         if hasattr(self, "_requests"):
             return self._requests
 
-        class Request:
-            def __init__(self, line, sids, orgs):
-                """
-                Extract the fields from the sftp activity log.
-
-                Note that the second field holds the digit(s) for
-                the date the request was received. In order to
-                ensure that the value has a uniform width (for
-                possible sorting purposes), we stick a zero in
-                front of the value and use the substring starting
-                two characters from the end (hence the -2 in the
-                tokens[1][-2:] expression).
-
-                Passed:
-                  line - record from the sftp log, fields separated by spaces
-                  sids - dictionary of sftp login IDs indexed by session ID
-                  orgs - dictionary of partner org names indexed by login ID
-                """
-
-                tokens = line.split()
-                if tokens[0].isdigit():
-                    tokens = tokens[1:]
-                self.date = "%s-%s" % (tokens[0], ("0" + tokens[1])[-2:])
-                self.time = tokens[2]
-                self.path = tokens[6][1:-1].replace("/pdq/full/", "")
-                self.sid = int(tokens[4][5:-2])
-                self.user = sids.get(self.sid, "")
-                if self.user and self.user in orgs:
-                    self.org = orgs[self.user].name or ""
-                else:
-                    self.org = ""
-        self._requests = {}
+        by_user = defaultdict(list)
         sids = {}
+        org_names = self.org_names
         count = 0
         self.logger.info("parsing %r", self.log_path)
         self.__sync_logs()
-        with gzip.open(self.log_path) as fp:
-            for line in fp.readlines():
-                line = str(line, "utf-8")
-                if "]: open " in line:
-                    request = Request(line, sids, self.orgs)
-                    if request.user in self.NON_PARTNERS:
-                        continue
-                    if request.user not in self._requests:
-                        self._requests[request.user] = []
-                    self._requests[request.user].append(request)
-                    count += 1
-                elif "session opened for local user" in line:
-                    tokens = line.split()
-                    if tokens[0].isdigit():
-                        tokens = tokens[1:]
-                    sid = int(tokens[4][5:-2])
-                    user = tokens[10]
-                    sids[sid] = user
-        args = count, len(self._requests)
+        with self.open_log() as fp:
+            for match in self.records(fp):
+                sid = int(match.group(1))
+                user = match.group(3)
+                if user is not None:
+                    sids[sid] = intern(user.decode("utf-8"))
+                    continue
+                user = sids.get(sid, "")
+                if user in self.NON_PARTNERS:
+                    continue
+                block, end = match.string, match.start()
+                start = block.rfind(b"\n", 0, end) + 1
+                tokens = block[start:end].decode("utf-8").split()
+                if tokens[0].isdigit():
+                    tokens = tokens[1:]
+                date = intern("%s-%s" % (tokens[0], ("0" + tokens[1])[-2:]))
+                path = intern(match.group(2).decode("utf-8"))
+                org = org_names.get(user, "")
+                by_user[user].append((user, org, path, sid, date, tokens[2]))
+                count += 1
+        requests = []
+        for user in sorted(by_user):
+            requests.extend(by_user[user])
+        self._requests = requests
+        args = count, len(by_user)
         self.logger.info("fetched %d requests from %d partners", *args)
         return self._requests
 
@@ -237,6 +266,10 @@ class Report(Job):
         difficulty in dealing with bizarre Windows file permissions
         configuration settings. If we really fail to bring down a needed
         log file successfully, we'll find out when we try to read it.
+
+        The commands are run in the log directory without changing
+        the working directory of the scheduler process, which is shared
+        by every job running in the service at the same time.
         """
 
         etc = self.tier.etc
@@ -247,50 +280,101 @@ class Report(Job):
         src = "%s@%s:/sftp/sftphome/cdrstaging/logs/*" % (usr, dns)
         cmd = "rsync -e \"%s\" %s ." % (ssh, src)
         fix = r"%s:\cdr\bin\fix-permissions.cmd ." % cdr.WORK_DRIVE
-        cwd = os.getcwd()
-        os.chdir(self.Month.LOGDIR)
+        opts = dict(cwd=self.Month.LOGDIR, shell=True, capture_output=True)
         self.logger.info(cmd)
-        cdr.run_command(cmd)
+        subprocess.run(cmd, **opts)
         if cdr.WORK_DRIVE:
             self.logger.info(fix)
-            cdr.run_command(fix)
-        os.chdir(cwd)
+            subprocess.run(fix, **opts)
 
     def make_report(self, requests):
         """
         Generate and save a report of files fetched by the PDQ partners.
+
+        The workbook is created in write-only mode, so the rows are
+        streamed to the file instead of being held in memory as
+        individual cell objects. In that mode rows can only be
+        appended, so the column widths and frozen panes are set
+        before the first row goes in, and the blank rows between
+        the title lines are appended explicitly.
         """
 
-        book = openpyxl.Workbook()
-        sheet = book.active
-        sheet.title = "Requests"
+        book = openpyxl.Workbook(write_only=True)
+        sheet = book.create_sheet("Requests")
         bold = openpyxl.styles.Font(size=12, bold=True)
         center = openpyxl.styles.Alignment(horizontal="center")
-        sheet.freeze_panes = "A6"
-        sheet["A1"] = str(datetime.date.today())
-        sheet["A1"].font = bold
-        sheet["A3"] = "Downloads for %s" % self.month
-        sheet["A3"].font = bold
+        opts = dict(name="centered", alignment=center)
+        book.add_named_style(openpyxl.styles.NamedStyle(**opts))
         for i, width in enumerate(self.WIDTHS):
             col = chr(ord("A")+i)
-            cell = "%s5" % col
             sheet.column_dimensions[col].width = width
-            sheet[cell] = self.LABELS[i]
-            sheet[cell].font = bold
-            sheet[cell].alignment = center
-        row = 6
-        for user in sorted(requests):
-            for r in requests[user]:
-                sheet.cell(row=row, column=1, value=r.user)
-                sheet.cell(row=row, column=2, value=r.org)
-                sheet.cell(row=row, column=3, value=r.path)
-                sheet.cell(row=row, column=4, value=r.sid)
-                sheet.cell(row=row, column=5, value=r.date).alignment = center
-                sheet.cell(row=row, column=6, value=r.time).alignment = center
-                row += 1
+        sheet.freeze_panes = "A6"
+
+        def styled(value, **styles):
+            cell = WriteOnlyCell(sheet, value=value)
+            for name, style in styles.items():
+                setattr(cell, name, style)
+            return cell
+
+        sheet.append([styled(str(datetime.date.today()), font=bold)])
+        sheet.append([])
+        sheet.append([styled("Downloads for %s" % self.month, font=bold)])
+        sheet.append([])
+        bold_center = dict(font=bold, alignment=center)
+        sheet.append([styled(label, **bold_center) for label in self.LABELS])
+        for login, org, path, sid, date, time in requests:
+            sheet.append([
+                login,
+                org,
+                path,
+                sid,
+                styled(date, style="centered"),
+                styled(time, style="centered"),
+            ])
         book.save(self.report_path)
         self.logger.info("wrote %r", self.report_path)
 
+    def open_log(self):
+        """
+        Open the compressed log file for reading as bytes.
+
+        If the rapidgzip package is installed, it decompresses the log
+        using all of the available processors. Otherwise we fall back
+        on the single-threaded gzip module from the standard library.
+        """
+
+        if rapidgzip is None:
+            return gzip.open(self.log_path)
+        self.logger.info("decompressing with rapidgzip")
+        opts = dict(parallelization=os.cpu_count())
+        return io.BufferedReader(rapidgzip.open(self.log_path, **opts))
+
+    def records(self, fp):
+        """
+        Find the session opening and file opening records in the log.
+
+        The log is read in large blocks, each cut back to the end of
+        its last complete line (the rest is carried over to the front
+        of the next block), and the RECORD_RE pattern is run over the
+        whole block.
+
+        Pass:
+            fp - binary stream for the decompressed log
+
+        Return:
+            iterator of match objects, in the order of the log
+        """
+
+        rest = b""
+        while True:
+            chunk = fp.read(self.CHUNK_SIZE)
+            block = rest + chunk
+            end = block.rfind(b"\n") + 1 if chunk else len(block)
+            rest = block[end:]
+            yield from self.RECORD_RE.finditer(block, 0, end)
+            if not chunk:
+                break
+
     def send_report(self):
         """
         Send the report as an attachment to an email message.
@@ -330,6 +414,7 @@ class Report(Job):
         LOGDIR = cdr.BASEDIR + "/sftp_log"
         REPORTS = cdr.BASEDIR + "/reports"
         FILEBASE = "PDQPartnerDownloads"
+        YYYYMM_RE = re.compile(r"(\d{4})(\d{2})")
 
         def __init__(self, yyyymm=None):
             """
@@ -339,9 +424,9 @@ class Report(Job):
             """
 
             if yyyymm:
-                match = re.match(r"(\d\d\d\d)(\d\d)", yyyymm)
+                match = self.YYYYMM_RE.fullmatch(yyyymm)
                 if not match:
-                    raise Exception("expected YYYYMM, got %r", yyyymm)
+                    raise Exception("expected YYYYMM, got %r" % yyyymm)
                 self.year = int(match.group(1))
                 self.month = int(match.group(2))
                 self.start = datetime.date(self.year, self.month, 1)
@@ -2,6 +2,8 @@
 """
 
 import os
+import subprocess
+from threading import Lock
 import cdr
 from cdrapi import db
 from .base_job import Job
@@ -12,31 +14,64 @@ class Sweeper(Job):
     """
 
     LOGNAME = "publish"
+    CLAIM = """\
+        UPDATE pub_proc
+           SET status = 'Started'
+        OUTPUT INSERTED.id, INSERTED.pub_subset
+         WHERE status = 'Ready'"""
     PUBSCRIPT = cdr.BASEDIR + "/publishing/publish.py"
     SUPPORTED_PARAMETERS = {}
+    LAUNCHED_LOCK = Lock()
+    LAUNCHED = {}
 
     def run(self):
         """Launch any publishing jobs which are in the queue.
 
         Make sure we don't do any real work if not on a Windows server.
+
+        On Windows the queued jobs are claimed with a single UPDATE
+        statement, which hands back the rows it changed. That way a
+        job which is queued while we're running is either launched by
+        this sweep or left for the next one, and never marked as
+        started without being launched.
+
+        The handles for the processes we launch are kept (in LAUNCHED)
+        and polled on each sweep, so the ones which have finished are
+        reaped instead of waiting for garbage collection.
         """
 
-        conn = db.connect(user="CdrPublishing")
-        cursor = conn.cursor()
-        query = db.Query("pub_proc", "id", "pub_subset")
-        query.where("status = 'Ready'")
-        rows = query.execute(cursor).fetchall()
-        if rows and os.name == "nt":
-            cursor.execute("""\
-                UPDATE pub_proc
-                   SET status = 'Started'
-                 WHERE status = 'Ready'""")
-            conn.commit()
+        self.reap()
+        with self.connection(user="CdrPublishing") as conn:
+            cursor = conn.cursor()
+            if os.name == "nt":
+                rows = cursor.execute(self.CLAIM).fetchall()
+                conn.commit()
+            else:
+                query = db.Query("pub_proc", "id", "pub_subset")
+                query.where("status = 'Ready'")
+                rows = query.execute(cursor).fetchall()
         for job_id, pub_subset in rows:
             self.logger.info("starting job %d (%s)", job_id, pub_subset)
-            args = ("CdrPublish", self.PUBSCRIPT, str(job_id))
+            args = ["CdrPublish", self.PUBSCRIPT, str(job_id)]
             if os.name == "nt":
-                os.spawnv(os.P_NOWAIT, cdr.PYTHON, args)
+                opts = dict(executable=cdr.PYTHON, close_fds=True)
+                process = subprocess.Popen(args, **opts)
+                with Sweeper.LAUNCHED_LOCK:
+                    Sweeper.LAUNCHED[job_id] = process
+                args = job_id, process.pid
+                self.logger.info("job %d has process ID %d", *args)
+
+    def reap(self):
+        """Forget the launched processes which have finished."""
+
+        with Sweeper.LAUNCHED_LOCK:
+            for job_id, process in list(Sweeper.LAUNCHED.items()):
+                code = process.poll()
+                if code is not None:
+                    del Sweeper.LAUNCHED[job_id]
+                    args = job_id, process.pid, code
+                    message = "job %d (process %d) exited with %d"
+                    self.logger.info(message, *args)
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ Logic for nightly and weekly CDR publishing jobs.
 """
 
 import os
+import subprocess
 import cdr
 from .base_job import Job
 
@@ -141,25 +142,20 @@ class Control:
         message = "%s job %s successfully" % (self.schedule.title(), stage)
         self.send_mail(subject.title(), message)
 
-    def quote_arg(self, arg):
-        """
-        Make sure the passed string is treated as a single argument
-        by the shell's command processor.
-        """
-
-        return '"' + arg.replace('"', "'") + '"'
-
     def send_mail(self, subject, message):
         """
         Send email to the users who monitor publishing jobs.
         If the email sending command fails, log the problem.
+
+        The arguments are passed to the script as a list, without
+        going through the shell, so the subject and message don't
+        need any quoting.
         """
 
         path = "%s/PubEmail.py" % self.PUBPATH
-        subject = self.quote_arg(subject)
-        message = self.quote_arg(message)
-        command = "%s %s %s %s" % (cdr.PYTHON, path, subject, message)
-        process = cdr.run_command(command)
+        args = [cdr.PYTHON, path, subject, message]
+        opts = dict(capture_output=True, encoding="utf-8")
+        process = subprocess.run(args, **opts)
         if process.stderr:
             self.logger.error("sending email: %s", process.stderr)
 
@@ -207,17 +203,17 @@ class Control:
         class property.
         """
 
-        path = "%s/%s" % (self.PUBPATH, script)
-        command = "python %s" % path
+        args = ["python", "%s/%s" % (self.PUBPATH, script)]
         if include_runmode:
-            command += " --%s" % self.mode
+            args.append("--%s" % self.mode)
         if include_pubmode:
             pubmode = (self.schedule == "weekly") and "export" or "interim"
-            command += " --%s" % pubmode
+            args.append("--%s" % pubmode)
         if self.job_id:
             pattern = self.EXTRA_ARGS.get(script)
             if pattern:
-                command += " " + pattern % self.job_id
+                args.append(pattern % self.job_id)
+        command = " ".join(args)
         self.logger.info(command)
         process = cdr.run_command(command, merge_output=merge_output)
         if self.failed(script, process):
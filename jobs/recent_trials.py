@@ -14,9 +14,12 @@ JIRA::OCECDR-5264 - Switch to NLM's new API (old one is broken)
 
 from cdr import Logging
 from cdrapi import db
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
-from functools import cached_property
-from requests import get
+from functools import cached_property, partial
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from .base_job import Job
 
 
@@ -45,7 +48,15 @@ class Control:
     SPONSOR       String for NCI as sponsor
     DESCRIPTION   String describing what the script does (for help)
     FIELDS        Fields we want NLM to return
+    SEARCH        Search terms for the trials we want (less the dates)
+    URL           Template for a search URL (filled in with a date range)
     NAME          Used for naming log
+    BATCH_SIZE    Number of new trials to insert between commits
+    INSERTS       SQL for adding trials, other IDs, and sponsors
+    WINDOW        Span of submission dates covered by each search
+    WORKERS       Number of searches we run at the same time
+    RETRIES       Settings for retrying failed requests to NLM
+    TIMEOUT       Seconds to wait for a connection and for a response
     """
 
     BASE = "https://clinicaltrials.gov/api/v2/studies"
@@ -70,8 +81,36 @@ class Control:
         "SponsorCollaboratorsModule",
     )
     SPONSOR = "National Cancer Institute"
+    SEARCH = (
+        f"(AREA[Condition]({' OR '.join(CONDITIONS)})"
+        f" OR AREA[ConditionSearch]({' OR '.join(DISEASES)})"
+        f" OR AREA[SponsorSearch]({SPONSOR}))"
+    )
+    URL = (
+        f"{BASE}?query.term={SEARCH}"
+        " AND AREA[StudyFirstSubmitDate]RANGE[{},{}]"
+        f"&fields={','.join(FIELDS)}&pageSize=1000"
+    )
     DESCRIPTION = "Get recent CT.gov Protocols"
     NAME = "RecentCTGovProtocols"
+    BATCH_SIZE = 500
+    INSERTS = (
+        "INSERT INTO ctgov_trial"
+        " (nct_id, trial_title, trial_phase, first_received)"
+        " VALUES (?, ?, ?, ?)",
+        "INSERT INTO ctgov_trial_other_id (nct_id, position, other_id)"
+        " VALUES (?, ?, ?)",
+        "INSERT INTO ctgov_trial_sponsor (nct_id, position, sponsor)"
+        " VALUES (?, ?, ?)",
+    )
+    WINDOW = timedelta(30)
+    WORKERS = 4
+    RETRIES = dict(
+        total=5,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+    )
+    TIMEOUT = 10, 300
 
     def __init__(self, options):
         """Remember the caller's options.
@@ -130,88 +169,181 @@ class Control:
 
     @cached_property
     def new_trials(self):
-        """Clinical trials we don't already have."""
+        """Clinical trials we don't already have.
+
+        The range of submission dates is split up into windows, which
+        are searched at the same time by a pool of worker threads. The
+        results are checked against the database here, in the order of
+        the windows, as soon as each window's pages have arrived.
+        The HTTP session is created here, before the workers start,
+        and handed to each of them, so they all share the same one.
+        """
 
-        # Assemble the query parameters.
         self.logger.info("fetching trials added on or after %s", self.cutoff)
-        conditions = f"AREA[Condition]({' OR '.join(self.CONDITIONS)})"
-        diseases = f"AREA[ConditionSearch]({' OR '.join(self.DISEASES)})"
-        sponsor = f"AREA[SponsorSearch]({self.SPONSOR})"
-        cutoff = f"AREA[StudyFirstSubmitDate]RANGE[{self.cutoff},MAX]"
-        term = f"({conditions} OR {diseases} OR {sponsor}) AND {cutoff}"
-        fields = ",".join(self.FIELDS)
-        params = f"query.term={term}&fields={fields}&pageSize=1000"
-        url = f"{self.BASE}?{params}"
-        self.logger.info(url)
-
-        # Loop to fetch all of the trials.
         trials = []
+        seen = set()
         fetched = 0
-        done = False
+        fetch = partial(self.fetch, session=self.session)
+        with ThreadPoolExecutor(self.WORKERS) as executor:
+            for pages in executor.map(fetch, self.windows):
+                for studies in pages:
+                    page = [Trial(study) for study in studies]
+                    fetched += len(page)
+                    nct_ids = [trial.nct_id for trial in page if trial.nct_id]
+                    seen |= self.known_trials(nct_ids)
+                    for trial in page:
+                        nct_id = trial.nct_id
+                        if nct_id and nct_id.upper() not in seen:
+                            trials.append(trial)
+                            seen.add(nct_id.upper())
+                            first_received = trial.first_received
+                            if first_received:
+                                if self.oldest is None:
+                                    self.oldest = first_received
+                                elif first_received < self.oldest:
+                                    self.oldest = first_received
+        self.logger.info("processed %d trials, %d new", fetched, len(trials))
+        return trials
+
+    @cached_property
+    def session(self):
+        """HTTP connections shared by the worker threads.
+
+        The connections are kept alive between requests, and failed
+        requests are retried (with increasing delays) by the adapter.
+        """
+
+        session = Session()
+        opts = dict(
+            pool_connections=self.WORKERS,
+            pool_maxsize=self.WORKERS,
+            max_retries=Retry(**self.RETRIES),
+        )
+        session.mount("https://", HTTPAdapter(**opts))
+        return session
+
+    @cached_property
+    def windows(self):
+        """Sequence of (start, end) strings for submission date ranges.
+
+        The last window is left open-ended, so we don't miss anything
+        submitted after we worked out the ranges.
+        """
+
+        windows = []
+        start = self.cutoff
+        last = date.today() - self.WINDOW
+        while start <= last:
+            end = start + self.WINDOW - timedelta(1)
+            windows.append((str(start), str(end)))
+            start = end + timedelta(1)
+        windows.append((str(start), "MAX"))
+        return windows
+
+    def fetch(self, window, session):
+        """Get all the pages of trials for a range of submission dates.
+
+        Invoked in a worker thread, so no database work happens here.
+
+        window - start and end strings for the date range
+        session - HTTP session shared by the worker threads
+
+        Return:
+            sequence of pages, each a sequence of study dictionaries
+        """
+
+        url = self.URL.format(*window)
+        self.logger.info(url)
+        pages = []
         token = None
-        while not done:
+        while True:
+            response = None
             try:
-                response = get(f"{url}&pageToken={token}" if token else url)
+                page_url = f"{url}&pageToken={token}" if token else url
+                response = session.get(page_url, timeout=self.TIMEOUT)
                 values = response.json()
-                studies = values["studies"]
+                pages.append(values["studies"])
                 token = values.get("nextPageToken")
-            except Exceptions:
-                args = response.reason, response.text
-                self.logger.exception("reason=%s response=%s", *args)
+            except Exception:
+                if response is not None:
+                    args = response.reason, response.text
+                    self.logger.exception("reason=%s response=%s", *args)
                 raise Exception(f"Unable to fetch trials for {url}")
-            for study in studies:
-                fetched += 1
-                trial = Trial(study)
-                if trial.nct_id and trial.nct_id not in self.old_trials:
-                    trials.append(trial)
-                    self.old_trials.add(trial.nct_id)
-                    if trial.first_received:
-                        if self.oldest is None:
-                            self.oldest = trial.first_received
-                        elif trial.first_received < self.oldest:
-                            self.oldest = trial.first_received
             if not token:
-                done = True
-        self.logger.info("processed %d trials, %d new", fetched, len(trials))
-        return trials
+                return pages
 
-    @cached_property
-    def old_trials(self):
-        """NCT IDs for clinical trials we already have."""
+    def known_trials(self, nct_ids):
+        """Find out which of a page of trials we already have.
+
+        Rather than pulling every NCT ID in the table into memory, we
+        let the database check just the IDs on the page, using the
+        index on the nct_id column.
 
-        rows = db.Query("ctgov_trial", "nct_id").execute(self.cursor)
+        nct_ids - sequence of NCT IDs from a page of NLM's results
+
+        Return:
+            set of the uppercased IDs which are already in the table
+        """
+
+        if not nct_ids:
+            return set()
+        query = db.Query("ctgov_trial", "nct_id")
+        query.where(query.Condition("nct_id", nct_ids, "IN"))
+        rows = query.execute(self.cursor).fetchall()
         return {row.nct_id.upper() for row in rows}
 
     def record(self):
-        """Save new trials to the database."""
+        """Save new trials to the database.
+
+        The trials are inserted in batches, using one executemany()
+        call per table and a single commit for each batch. If a batch
+        fails it is rolled back and its trials are retried one at a
+        time, so that one bad trial doesn't keep the rest from being
+        recorded.
+        """
 
         loaded = 0
-        for trial in self.new_trials:
+        self.cursor.fast_executemany = True
+        for start in range(0, len(self.new_trials), self.BATCH_SIZE):
+            batch = self.new_trials[start:start+self.BATCH_SIZE]
             try:
-                self.logger.info("adding %s", trial.nct_id)
-                self.cursor.execute("""\
-INSERT INTO ctgov_trial (nct_id, trial_title, trial_phase, first_received)
-     VALUES (?, ?, ?, ?)""", (trial.nct_id, trial.title[:1024],
-                              trial.phase and trial.phase[:20] or None,
-                              trial.first_received))
-                position = 1
-                for other_id in trial.other_ids:
-                    self.cursor.execute("""\
-INSERT INTO ctgov_trial_other_id (nct_id, position, other_id)
-     VALUES (?, ?, ?)""", (trial.nct_id, position, other_id[:1024]))
-                    position += 1
-                position = 1
-                for sponsor in trial.sponsors:
-                    self.cursor.execute("""\
-INSERT INTO ctgov_trial_sponsor (nct_id, position, sponsor)
-     VALUES (?, ?, ?)""", (trial.nct_id, position, sponsor[:1024]))
-                    position += 1
+                self.__insert(batch)
                 self.conn.commit()
-                loaded += 1
+                loaded += len(batch)
+                continue
             except Exception:
-                self.logger.exception(trial.nct_id)
+                self.conn.rollback()
+                self.logger.exception("batch failed; retrying each trial")
+            for trial in batch:
+                try:
+                    self.__insert([trial])
+                    self.conn.commit()
+                    loaded += 1
+                except Exception:
+                    self.conn.rollback()
+                    self.logger.exception(trial.nct_id)
         self.logger.info("loaded %d new trials", loaded)
 
+    def __insert(self, trials):
+        """Add rows for a sequence of trials (without committing).
+
+        trials - sequence of `Trial` objects
+        """
+
+        rows = [], [], []
+        for trial in trials:
+            self.logger.info("adding %s", trial.nct_id)
+            nct_id = trial.nct_id
+            values = nct_id, trial.title, trial.phase, trial.first_received
+            rows[0].append(values)
+            for position, other_id in enumerate(trial.other_ids, start=1):
+                rows[1].append((nct_id, position, other_id))
+            for position, sponsor in enumerate(trial.sponsors, start=1):
+                rows[2].append((nct_id, position, sponsor))
+        for sql, values in zip(self.INSERTS, rows):
+            if values:
+                self.cursor.executemany(sql, values)
+
 
 class Trial:
     """
@@ -222,8 +354,14 @@ class Trial:
     phase            string representing the current phase of the trial
     first_received   the date NLM first received the trial information
     sponsors         sequence of the names of the sponsors for the trial
+
+    The string values are cut down to the sizes of the database columns
+    in which they are stored (see MAX_PHASE and MAX_STRING).
     """
 
+    MAX_PHASE = 20
+    MAX_STRING = 1024
+
     PHASES = dict(
         NA="N/A",
         EARLY_PHASE1="Early Phase 1",
@@ -270,11 +408,11 @@ class Trial:
         other_ids = []
         org_study_id = self.id_info.get("id", "").strip()
         if org_study_id:
-            other_ids = [org_study_id]
+            other_ids = [org_study_id[:self.MAX_STRING]]
         for id_info in self.identification.get("secondaryIdInfos", []):
             secondary_id = id_info.get("id", "").strip()
             if secondary_id:
-                other_ids.append(secondary_id)
+                other_ids.append(secondary_id[:self.MAX_STRING])
         return other_ids
 
     @cached_property
@@ -288,7 +426,7 @@ class Trial:
                 phase = phase.strip()
                 if phase:
                     phases.append(self.PHASES.get(phase, phase))
-        return "/".join(sorted(phases)) or None
+        return "/".join(sorted(phases))[:self.MAX_PHASE] or None
 
     @cached_property
     def protocol(self):
@@ -305,12 +443,12 @@ class Trial:
             if "leadSponsor" in module:
                 name = module["leadSponsor"].get("name", "").strip()
                 if name:
-                    sponsors = [name]
+                    sponsors = [name[:self.MAX_STRING]]
             if "collaborators" in module:
                 for collaborator in module["collaborators"]:
                     name = collaborator.get("name", "").strip()
                     if name:
-                        sponsors.append(name)
+                        sponsors.append(name[:self.MAX_STRING])
         return sponsors
 
     @cached_property
@@ -320,7 +458,7 @@ class Trial:
         title = self.identification.get("briefTitle", "").strip()
         if not title:
             title = self.identification.get("officialTitle", "").strip()
-        return title or None
+        return title[:self.MAX_STRING] or None
 
 
 def main():
@@ -5,10 +5,14 @@ Logic for reports on the translation job queues
 import cdr
 from cdrapi import db
 import datetime
-from .base_job import Job
+import logging
+from html import escape
+from itertools import groupby
+from operator import itemgetter
+from .base_job import Job as BaseJob
 
 
-class ReportTask(Job):
+class ReportTask(BaseJob):
     """
     Subclass for managing scheduled summary translation job reports.
     """
@@ -17,7 +21,10 @@ class ReportTask(Job):
     SUPPORTED_PARAMETERS = {"mode", "doctype", "recip", "schedule"}
 
     def run(self):
-        Control(self.opts, self.logger).run()
+        if self.opts.get("doctype") == BatchControl.ALL:
+            BatchControl(self.opts, self.logger).run()
+        else:
+            Control(self.opts, self.logger).run()
 
 
 class ReportTools:
@@ -29,6 +36,9 @@ class ReportTools:
     CHARSET         For HTML page.
     TSTYLE          CSS formatting rules for table elements.
     TO_STRING_OPTS  Options used for serializing HTML report object.
+    TD_NOWRAP_STYLE Serialized styles for a cell which mustn't wrap.
+    TD_NOWRAP_HTML  Template for the markup of an unwrapped (date) cell.
+    CAPTION_STYLE   CSS formatting rules for table captions.
     B               HTML builder module imported at Control class scope.
     HTML            HTML module imported at Control class scope.
     """
@@ -50,45 +60,38 @@ class ReportTools:
         "encoding": "unicode",
         "doctype": "<!DOCTYPE html>"
     }
+    TD_NOWRAP_STYLE = f"{BaseJob.TD_STYLE};white-space:nowrap"
+    TD_NOWRAP_HTML = f'<td style="{escape(TD_NOWRAP_STYLE)}">{{}}</td>'
+    CAPTION_STYLE = (
+        "font-weight: bold; font-size: 1.2em; font-family: Arial"
+        "; text-align: left;"
+    )
 
     @classmethod
-    def th(cls, label, **styles):
-        """
-        Helper method to generate a table column header.
-
-        label      Display string for the column header
-        styles     Optional style tweaks. See merge_styles() method.
+    def table(cls, caption, labels, rows):
         """
+        Assemble a report table, parsing its markup in a single pass.
 
-        default_styles = {
-            "font-family": "Arial",
-            "border": "1px solid #999",
-            "margin": "auto",
-            "padding": "2px",
-        }
-        style = cls.merge_styles(default_styles, **styles)
-        return cls.B.TH(label, style=style)
+        caption    String for the table's caption
+        labels     Strings for the column headers
+        rows       Sequence of strings for TR elements, built using
+                   the BaseJob.td_html() method.
 
-    @classmethod
-    def td(cls, data, url=None, **styles):
-        """
-        Helper method to generate a table data cell.
-
-        data       Data string to be displayed in the cell
-        styles     Optional style tweaks. See merge_styles() method.
+        Return:
+          TABLE element to be added to the report
         """
 
-        default_styles = {
-            "font-family": "Arial",
-            "border": "1px solid #999",
-            "vertical-align": "top",
-            "padding": "2px",
-            "margin": "auto"
-        }
-        style = cls.merge_styles(default_styles, **styles)
-        if url:
-            return cls.B.TD(cls.B.A(data, href=url), style=style)
-        return cls.B.TD(data, style=style)
+        th = BaseJob.TH_HTML
+        headers = "".join(th.format(escape(label)) for label in labels)
+        parts = (
+            f'<table style="{escape(cls.TSTYLE)}">',
+            f'<caption style="{escape(cls.CAPTION_STYLE)}">',
+            escape(caption),
+            f"</caption><tr>{headers}</tr>",
+            "".join(rows),
+            "</table>",
+        )
+        return cls.HTML.fragment_fromstring("".join(parts))
 
     @classmethod
     def serialize(cls, html):
@@ -100,23 +103,6 @@ class ReportTools:
 
         return cls.HTML.tostring(html, **cls.TO_STRING_OPTS)
 
-    @staticmethod
-    def merge_styles(defaults, **styles):
-        """
-        Allow the default styles for an element to be overridden.
-
-        defaults   Dictionary of style settings for a given element.
-        styles     Dictionary of additional or replacement style
-                   settings. If passed as separate arguments the
-                   setting names with hyphens will have to have been
-                   given with underscores instead of hyphens. We
-                   restore the names which CSS expects.
-        """
-
-        d = dict(defaults, **styles)
-        s = ["%s:%s" % (k.replace("_", "-"), v) for k, v in d.items()]
-        return ";".join(s)
-
 
 class Control(ReportTools):
     """
@@ -130,32 +116,78 @@ class Control(ReportTools):
     logger          Object for recording log information about the report.
     cursor          Object for submitting queries to the database.
     recip           Optional email address to divert messages for testing.
+    tier            Name of the tier on which the report is run.
+    today           Date shown on the reports.
+    recips_cache    Group email addresses already looked up for this run.
+
+    The dates on which the jobs reached their current states are
+    fetched as dates (STATE_DATE), with the time of day dropped by
+    the database server. The glossary job queries pick up the title
+    of each concept's first GlossaryTermName document (NAME_TITLE) in
+    the same query, for use in the concept's constructed title.
     """
 
     DOCTYPES = "Summary", "Media", "Glossary"
     SCHEDULES = "weekly", "nightly"
+    STATE_DATE = "CAST(j.state_date AS date) AS state_date"
+    NAME_TITLE = (
+        "(SELECT MIN(n.title)"
+        " FROM query_term q"
+        " JOIN document n ON n.id = q.doc_id"
+        " WHERE q.path = '/GlossaryTermName/GlossaryTermConcept/@cdr:ref'"
+        " AND q.int_val = d.id) AS name_title"
+    )
+    FETCH_SIZE = 500
 
-    def __init__(self, options, logger):
+    def __init__(self, options, logger, cursor=None, tier=None,
+                 recips_cache=None):
         """
         Save the logger object and extract and validate the settings:
 
         mode
             must be "test" or "live" (required); test mode restricts
             recipient list for report
+
+        The cursor, tier name, and cache of group email addresses can
+        be passed in by a `BatchControl` object running the reports for
+        more than one document type.
         """
 
         self.__logger = logger
         self.__opts = options
+        self.recips_cache = {} if recips_cache is None else recips_cache
+        if cursor is not None:
+            self._cursor = cursor
+        if tier is not None:
+            self._tier = tier
 
     def run(self):
-        "Generate and email the report."
+        """
+        Generate and email the report.
+
+        Unless we were given a cursor, the database connection is
+        borrowed for the length of the run from the pool shared by
+        the scheduler's jobs, rather than logging in to the database
+        server again for every report.
+        """
+
         self.logger.info("*** top of %s %s run", self.schedule, self.doctype)
+        if hasattr(self, "_cursor"):
+            self.__send_reports()
+        else:
+            with BaseJob.connection(user="CdrGuest") as conn:
+                self._cursor = conn.cursor()
+                self.__send_reports()
+        self.logger.info("%s %s job completed", self.schedule, self.doctype)
+
+    def __send_reports(self):
+        "Send the nightly reports to each user, or the weekly report."
+
         if self.schedule == "nightly":
             for user in self.users:
                 user.send_report(self)
         else:
             self.send_report(self.jobs)
-        self.logger.info("%s %s job completed", self.schedule, self.doctype)
 
     @property
     def logger(self):
@@ -172,7 +204,8 @@ class Control(ReportTools):
         if not hasattr(self, "_doctype"):
             self._doctype = self.__opts.get("doctype", "Summary")
             if self._doctype not in self.DOCTYPES:
-                raise(f"Unsupported document type {self._doctype!r}")
+                message = f"Unsupported document type {self._doctype!r}"
+                raise Exception(message)
         return self._doctype
 
     @property
@@ -193,6 +226,20 @@ class Control(ReportTools):
     def test(self):
         return self.mode == "test"
 
+    @property
+    def tier(self):
+        if not hasattr(self, "_tier"):
+            self._tier = cdr.Tier().name
+        return self._tier
+
+    @property
+    def today(self):
+        """Report date, the same for every report in the run."""
+
+        if not hasattr(self, "_today"):
+            self._today = datetime.date.today()
+        return self._today
+
     @property
     def title(self):
         if not hasattr(self, "_title"):
@@ -205,6 +252,15 @@ class Control(ReportTools):
 
     @property
     def cursor(self):
+        """
+        Object for submitting queries to the database.
+
+        This is the cursor passed to the constructor, or the one
+        borrowed from the job pool by `run()`. A `Control` object used
+        some other way should be given a cursor by its caller; failing
+        that, a connection of its own (outside the pool) is opened.
+        """
+
         if not hasattr(self, "_cursor"):
             self._cursor = db.connect(user="CdrGuest").cursor()
         return self._cursor
@@ -223,7 +279,7 @@ class Control(ReportTools):
         """
 
         if not hasattr(self, "_jobs"):
-            self._jobs = getattr(self, f"_load_{self.doctype.lower()}_jobs")()
+            self._jobs = self.JOB_LOADERS[self.doctype](self)
         return self._jobs
 
     @property
@@ -232,7 +288,9 @@ class Control(ReportTools):
         Collect information on users with active translation jobs
 
         Work is handed off to a specialized method for the job's
-        document type.
+        document type. The rows are ordered by user, and each user's
+        rows are folded into the user's object as soon as they've been
+        read, so nothing else can use the cursor inside the loop.
 
         Return:
           sequence of `User` objects
@@ -241,17 +299,19 @@ class Control(ReportTools):
         if not hasattr(self, "_users"):
             self.logger.info("loading users")
             users = []
-            missing_email = set()
-            rows = getattr(self, f"_load_{self.doctype.lower()}_users")()
-            for doc_id, title, state, name, fullname, uid, email, date in rows:
-                if email:
-                    if not users or uid != users[-1].uid:
-                        user = User(uid, name, fullname, email, self.recip)
-                        users.append(user)
-                    user.add_job(state, date, doc_id, title)
-                elif uid not in missing_email:
+            rows = self.USER_LOADERS[self.doctype](self)
+            for uid, group in groupby(rows, key=itemgetter(5)):
+                group = list(group)
+                _, _, _, name, fullname, _, email, _ = group[0]
+                if not email:
                     self.logger.error("user %s has no email address" % name)
-                    missing_email.add(uid)
+                    continue
+                user = User(uid, name, fullname, email, self.recip)
+                user.jobs = [
+                    User.Job(state, date, doc_id, title)
+                    for doc_id, title, state, _, _, _, _, date in group
+                ]
+                users.append(user)
             self._users = users
         return self._users
 
@@ -259,37 +319,62 @@ class Control(ReportTools):
         """
         Collect information on users with active Summary translation jobs
 
+        The rows are not fetched up front, so the caller can start on
+        them as they arrive (see the `users` property).
+
         Return:
-          sequence of database resultset rows
+          iterator of database resultset rows
         """
 
         fields = ("d.id", "d.title", "s.value_name", "u.name", "u.fullname",
-                  "u.id", "u.email", "j.state_date")
+                  "u.id", "u.email", self.STATE_DATE)
         query = db.Query("summary_translation_job j", *fields)
         query.join("usr u", "u.id = j.assigned_to")
         query.join("document d", "d.id = j.english_id")
         query.join("summary_translation_state s", "s.value_id = j.state_id")
         query.where("s.value_name <> 'Translation Made Publishable'")
         query.order("u.id", "s.value_pos", "j.state_date", "d.title")
-        return query.execute(self.cursor).fetchall()
+        return self.__stream(query)
 
     def _load_media_users(self):
         """
         Collect information on users with active Media translation jobs
 
+        The rows are not fetched up front, so the caller can start on
+        them as they arrive (see the `users` property).
+
         Return:
-          sequence of database resultset rows
-          sequence of `User` objects
+          iterator of database resultset rows
         """
 
         fields = ("d.id", "d.title", "s.value_name", "u.name", "u.fullname",
-                  "u.id", "u.email", "j.state_date")
+                  "u.id", "u.email", self.STATE_DATE)
         query = db.Query("media_translation_job j", *fields)
         query.join("usr u", "u.id = j.assigned_to")
         query.join("document d", "d.id = j.english_id")
         query.join("media_translation_state s", "s.value_id = j.state_id")
         query.order("u.id", "s.value_pos", "j.state_date", "d.title")
-        return query.execute(self.cursor).fetchall()
+        return self.__stream(query)
+
+    def __stream(self, query):
+        """
+        Fetch the rows for a query a batch at a time
+
+        Only FETCH_SIZE rows are held in memory at once, no matter
+        how many jobs are in the queue.
+
+        Pass:
+          query - `db.Query` object for the rows
+
+        Return:
+          iterator of database resultset rows
+        """
+
+        cursor = query.execute(self.cursor)
+        rows = cursor.fetchmany(self.FETCH_SIZE)
+        while rows:
+            yield from rows
+            rows = cursor.fetchmany(self.FETCH_SIZE)
 
     def _load_glossary_users(self):
         """
@@ -299,50 +384,50 @@ class Control(ReportTools):
 
         Return:
           sequence of database resultset rows
-          sequence of `User` objects
         """
 
         fields = ("d.id", "t.name", "s.value_name", "u.name", "u.fullname",
-                  "u.id", "s.value_pos", "u.email", "j.state_date")
+                  "u.id", "s.value_pos", "u.email", self.STATE_DATE,
+                  "d.title", self.NAME_TITLE)
         query = db.Query("glossary_translation_job j", *fields)
         query.join("usr u", "u.id = j.assigned_to")
         query.join("document d", "d.id = j.doc_id")
         query.join("doc_type t", "t.id = d.doc_type")
         query.join("glossary_translation_state s", "s.value_id = j.state_id")
-        rows = query.execute(self.cursor).fetchall()
         users = {}
-        for doc_id, doc_type, state, name, full, uid, pos, email, date in rows:
-            title = self.__get_glossary_title(doc_id, doc_type)
-            key = uid, pos, str(date)[:10], title
+        for row in query.execute(self.cursor).fetchall():
+            (doc_id, doc_type, state, name, full, uid, pos, email, date,
+             title, name_title) = row
+            title = self.__glossary_title(doc_id, doc_type, title, name_title)
+            key = uid, pos, str(date), title
             values = doc_id, title, state, name, full, uid, email, date
             users[key] = values
         return [users[key] for key in sorted(users)]
 
-    def __get_glossary_title(self, doc_id, doc_type):
+    @staticmethod
+    def __glossary_title(doc_id, doc_type, title, name_title):
         """
-        Fetch or construct title for Glossary document
+        Construct the title for a Glossary document
 
         For GlossaryTermConcept documents we construct a title in
         the form: "GTC for [title of first GTN document]
 
+        Pass:
+          doc_id - CDR ID for the document
+          doc_type - name of the document's type
+          title - the document's own title
+          name_title - title of the concept's first GTN document
+                       (see NAME_TITLE)
+
         Return:
           string representing document's title
         """
 
         if doc_type == "GlossaryTermConcept":
-            path = "/GlossaryTermName/GlossaryTermConcept/@cdr:ref"
-            query = db.Query("document d", "d.title").limit(1)
-            query.join("query_term q", "q.doc_id = d.id")
-            query.where(query.Condition("q.path", path))
-            query.where(query.Condition("q.int_val", doc_id))
-            query.order("d.title")
-            row = query.execute(self.cursor).fetchone()
-            if row:
-                return "GTC for {}".format(row[0])
+            if name_title:
+                return "GTC for {}".format(name_title)
             return "GTC CDR{:d}".format(doc_id)
-        query = db.Query("document", "title")
-        query.where(query.Condition("id", doc_id))
-        return query.execute(self.cursor).fetchone()[0]
+        return title
 
     def _load_media_jobs(self):
         """
@@ -352,7 +437,7 @@ class Control(ReportTools):
           Sequence of tuples of values
         """
 
-        fields = "d.title", "d.id", "u.fullname", "j.state_date"
+        fields = "d.title", "d.id", "u.fullname", self.STATE_DATE
         query = db.Query("media_translation_job j", *fields)
         query.join("usr u", "u.id = j.assigned_to")
         query.join("document d", "d.id = j.english_id")
@@ -373,7 +458,8 @@ class Control(ReportTools):
           Sequence of tuples of values
         """
 
-        fields = "d.id", "t.name", "u.fullname", "j.state_date"
+        fields = ("d.id", "t.name", "u.fullname", self.STATE_DATE,
+                  "d.title", self.NAME_TITLE)
         query = db.Query("glossary_translation_job j", *fields)
         query.join("usr u", "u.id = j.assigned_to")
         query.join("document d", "d.id = j.doc_id")
@@ -382,11 +468,24 @@ class Control(ReportTools):
         query.where("s.value_name = 'Ready for Translation'")
         jobs = {}
         rows = query.execute(self.cursor).fetchall()
-        for doc_id, doc_type, name, date in rows:
-            title = self.__get_glossary_title(doc_id, doc_type)
+        for doc_id, doc_type, name, date, title, name_title in rows:
+            title = self.__glossary_title(doc_id, doc_type, title, name_title)
             jobs[(title.lower(), doc_id)] = (title, doc_id, name, date)
         return [jobs[key] for key in sorted(jobs)]
 
+    # Methods for loading each document type's rows (see the `users`
+    # and `jobs` properties). Weekly reports exist only for the
+    # document types in JOB_LOADERS.
+    USER_LOADERS = dict(
+        Summary=_load_summary_users,
+        Media=_load_media_users,
+        Glossary=_load_glossary_users,
+    )
+    JOB_LOADERS = dict(
+        Media=_load_media_jobs,
+        Glossary=_load_glossary_jobs,
+    )
+
     def send_report(self, jobs):
         """
         Send weekly report of new translation jobs to lead translator
@@ -396,16 +495,18 @@ class Control(ReportTools):
         """
 
         report = self.create_report(jobs)
-        self.logger.debug("report\n%s", report)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("report\n%s", report)
         if self.recip:
             recips = [self.recip]
         else:
             group = "Spanish Translation Leads"
             if self.test:
                 group = "Test Translation Queue Recips"
-            recips = Job.get_group_email_addresses(group)
+            cache = self.recips_cache
+            recips = BaseJob.get_group_email_addresses(group, cache)
         if recips:
-            subject = "[%s] %s" % (cdr.Tier().name, self.title)
+            subject = "[%s] %s" % (self.tier, self.title)
             opts = dict(subject=subject, body=report, subtype="html")
             message = cdr.EmailMessage(self.SENDER, recips, **opts)
             message.send()
@@ -417,7 +518,6 @@ class Control(ReportTools):
     def create_report(self, jobs):
         title = "New {} Translation Jobs".format(self.doctype)
         style = "font-size: .9em; font-style: italic; font-family: Arial"
-        today = datetime.date.today()
         report = self.B.HTML(
             self.B.HEAD(
                 self.B.META(charset=self.CHARSET),
@@ -425,34 +525,71 @@ class Control(ReportTools):
             ),
             self.B.BODY(
                 self.B.H3(title, style="color: navy; font-family: Arial;"),
-                self.B.P("Report date: {}".format(today), style=style),
+                self.B.P("Report date: {}".format(self.today), style=style),
                 self.make_table(jobs)
             )
         )
         return self.serialize(report)
 
     def make_table(self, jobs):
-        style = "font-weight: bold; font-size: 1.2em; font-family: Arial"
-        style += "; text-align: left;"
-        table = self.B.TABLE(
-            self.B.CAPTION("Ready For Translation", style=style),
-            self.B.TR(
-                self.th("Title"),
-                self.th("CDR ID"),
-                self.th("Translator"),
-                self.th("Date"),
-            ),
-            style=self.TSTYLE
-        )
+        td = BaseJob.td_html
+        nowrap = self.TD_NOWRAP_HTML.format
+        rows = []
         for title, doc_id, user, date in jobs:
-            tr = self.B.TR(
-                self.td(title),
-                self.td(str(doc_id)),
-                self.td(user),
-                self.td(str(date)[:10], white_space="nowrap")
-            )
-            table.append(tr)
-        return table
+            title, user = escape(title), escape(user)
+            cells = td(title), td(doc_id), td(user), nowrap(date)
+            rows.append(f"<tr>{''.join(cells)}</tr>")
+        labels = "Title", "CDR ID", "Translator", "Date"
+        return self.table("Ready For Translation", labels, rows)
+
+
+class BatchControl:
+    """
+    Run the reports for all of the document types in one invocation.
+
+    The reports share one database connection, one lookup of the
+    tier name, and one cache of group email addresses, instead of
+    each paying for its own.
+    """
+
+    ALL = "All"
+
+    def __init__(self, options, logger):
+        """
+        Save the logger object and the settings for the reports.
+        """
+
+        self.__logger = logger
+        self.__opts = options
+
+    def run(self):
+        """
+        Generate and email the reports for each document type.
+
+        A failure for one document type is logged and doesn't keep
+        the reports for the others from going out. If any of them
+        failed, an exception is raised once they have all been tried.
+        """
+
+        if self.__opts.get("schedule", "nightly") == "nightly":
+            doctypes = Control.DOCTYPES
+        else:
+            doctypes = tuple(Control.JOB_LOADERS)
+        tier = cdr.Tier().name
+        recips_cache = {}
+        failed = []
+        with BaseJob.connection(user="CdrGuest") as conn:
+            cursor = conn.cursor()
+            for doctype in doctypes:
+                opts = dict(self.__opts, doctype=doctype)
+                try:
+                    args = opts, self.__logger, cursor, tier, recips_cache
+                    Control(*args).run()
+                except Exception as e:
+                    self.__logger.exception("%s report: %s", doctype, e)
+                    failed.append(doctype)
+        if failed:
+            raise Exception(f"reports failed for {', '.join(failed)}")
 
 
 class User(ReportTools):
@@ -468,21 +605,20 @@ class User(ReportTools):
         self.recip = recip
         self.jobs = []
 
-    def add_job(self, state, date, doc_id, title):
-        self.jobs.append(self.Job(state, date, doc_id, title))
-
     def send_report(self, control):
         report = self.create_report(control)
-        control.logger.debug("report\n%s", report)
+        if control.logger.isEnabledFor(logging.DEBUG):
+            control.logger.debug("report\n%s", report)
         if self.recip:
             recips = [self.recip]
         elif control.test:
             group = "Test Translation Queue Recips"
-            recips = Job.get_group_email_addresses(group)
+            cache = control.recips_cache
+            recips = BaseJob.get_group_email_addresses(group, cache)
         else:
             recips = [self.email]
         if recips:
-            subject = "[%s] %s" % (cdr.Tier().name, control.title)
+            subject = "[%s] %s" % (control.tier, control.title)
             opts = dict(subject=subject, body=report, subtype="html")
             message = cdr.EmailMessage(self.SENDER, recips, **opts)
             message.send()
@@ -497,7 +633,7 @@ class User(ReportTools):
         style = "font-size: .9em; font-style: italic; font-family: Arial"
         body = self.B.BODY(
             self.B.H3(title, style="color: navy; font-family: Arial;"),
-            self.B.P("Report date: %s" % datetime.date.today(), style=style),
+            self.B.P("Report date: %s" % control.today, style=style),
         )
         if control.test:
             body.append(self.B.P(self.TEST.format(self.email)))
@@ -512,23 +648,14 @@ class User(ReportTools):
         return self.serialize(report)
 
     def add_tables(self, body):
-        style = "font-weight: bold; font-size: 1.2em; font-family: Arial"
-        style += "; text-align: left;"
-        caption = table = None
+        groups = []
         for job in self.jobs:
-            if table is None or job.state != caption:
-                caption = job.state
-                table = self.B.TABLE(
-                    self.B.CAPTION(caption, style=style),
-                    self.B.TR(
-                        self.th("Date"),
-                        self.th("CDR ID"),
-                        self.th("Title"),
-                    ),
-                    style=self.TSTYLE
-                )
-                body.append(table)
-            table.append(job.tr())
+            if not groups or job.state != groups[-1][0]:
+                groups.append((job.state, []))
+            groups[-1][1].append(job.row())
+        labels = "Date", "CDR ID", "Title"
+        for caption, rows in groups:
+            body.append(self.table(caption, labels, rows))
 
     class Job:
 
@@ -538,12 +665,11 @@ class User(ReportTools):
             self.doc_id = doc_id
             self.title = title
 
-        def tr(self):
-            return User.B.TR(
-                User.td(str(self.date)[:10], white_space="nowrap"),
-                User.td(str(self.doc_id)),
-                User.td(self.title)
-            )
+        def row(self):
+            td = BaseJob.td_html
+            date = User.TD_NOWRAP_HTML.format(self.date)
+            title = td(escape(self.title))
+            return f"<tr>{date}{td(self.doc_id)}{title}</tr>"
 
 
 def main():
@@ -552,7 +678,6 @@ def main():
     """
 
     import argparse
-    import logging
     fc = argparse.ArgumentDefaultsHelpFormatter
     desc = "Report on CDR translation jobs"
     parser = argparse.ArgumentParser(description=desc, formatter_class=fc)
@@ -560,7 +685,8 @@ def main():
                         help="controls who gets the report")
     parser.add_argument("--log-level", choices=("info", "debug", "error"),
                         default="info", help="verbosity of logging")
-    parser.add_argument("--doctype", choices=Control.DOCTYPES)
+    doctypes = Control.DOCTYPES + (BatchControl.ALL,)
+    parser.add_argument("--doctype", choices=doctypes)
     parser.add_argument("--schedule", choices=Control.SCHEDULES)
     parser.add_argument("--recip")
     args = parser.parse_args()
@@ -568,7 +694,10 @@ def main():
     logging.basicConfig(**opts)
     opts = dict([(k.replace("_", "-"), v) for k, v in args._get_kwargs()])
     del opts["log-level"]
-    Control(opts, logging.getLogger()).run()
+    if opts.get("doctype") == BatchControl.ALL:
+        BatchControl(opts, logging.getLogger()).run()
+    else:
+        Control(opts, logging.getLogger()).run()
 
 
 if __name__ == "__main__":